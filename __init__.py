@@ -0,0 +1,243 @@
+from flask import Flask, render_template, redirect, url_for, flash, request, current_app, jsonify, abort
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from flask_wtf.csrf import CSRFProtect
+from app.models import db, User, load_cached_user, invalidate_user_cache
+from app.database import mongo
+from app.forms import RegistrationForm, LoginForm, PatientForm, SearchForm
+from config import Config
+import os
+
+login_manager = LoginManager()
+csrf = CSRFProtect()
+
+def create_app(config_class=Config):
+    """Application factory, configured before any extension is initialised"""
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    
+    # Initialize extensions
+    db.init_app(app)
+    mongo.init_app(app)
+    csrf.init_app(app)
+    login_manager.init_app(app)
+    login_manager.login_view = 'login'
+    login_manager.login_message = 'Please log in to access this page.'
+    login_manager.login_message_category = 'info'
+    
+    if app.config.get('AUTO_CREATE_TABLES'):
+        with app.app_context():
+            db.create_all()
+    
+    register_routes(app)
+    register_error_handlers(app)
+    
+    return app
+
+@login_manager.user_loader
+def load_user(user_id):
+    """Load user by ID for Flask-Login"""
+    return load_cached_user(user_id)
+
+def _patient_from_form(form):
+    """Convert submitted form values to the types stored in MongoDB"""
+    return {
+        'gender': form.gender.data,
+        'age': form.age.data,
+        'hypertension': int(form.hypertension.data),
+        'heart_disease': int(form.heart_disease.data),
+        'ever_married': form.ever_married.data,
+        'work_type': form.work_type.data,
+        'Residence_type': form.Residence_type.data,
+        'avg_glucose_level': form.avg_glucose_level.data,
+        'bmi': float(form.bmi.data) if form.bmi.data else None,
+        'smoking_status': form.smoking_status.data,
+        'stroke': int(form.stroke.data)
+    }
+
+def register_routes(app):
+    """Register application routes"""
+    
+    @app.route('/')
+    def index():
+        """Home page"""
+        if current_user.is_authenticated:
+            return redirect(url_for('dashboard'))
+        return render_template('index.html')
+    
+    @app.route('/register', methods=['GET', 'POST'])
+    def register():
+        """User registration"""
+        if current_user.is_authenticated:
+            return redirect(url_for('dashboard'))
+        
+        form = RegistrationForm()
+        if form.validate_on_submit():
+            user = User(username=form.username.data, email=form.email.data)
+            user.set_password(form.password.data)
+            db.session.add(user)
+            db.session.commit()
+            
+            flash('Registration successful! Please log in.', 'success')
+            return redirect(url_for('login'))
+        
+        return render_template('register.html', form=form)
+    
+    @app.route('/login', methods=['GET', 'POST'])
+    def login():
+        """User login"""
+        if current_user.is_authenticated:
+            return redirect(url_for('dashboard'))
+        
+        form = LoginForm()
+        if form.validate_on_submit():
+            user = User.query.filter_by(username=form.username.data).first()
+            
+            if user and user.check_password_cached(form.password.data):
+                login_user(user)
+                flash('Login successful!', 'success')
+                return redirect(url_for('dashboard'))
+            
+            flash('Invalid username or password', 'danger')
+        
+        return render_template('login.html', form=form)
+    
+    @app.route('/logout')
+    @login_required
+    def logout():
+        """User logout"""
+        invalidate_user_cache(current_user.id)
+        logout_user()
+        flash('You have been logged out.', 'info')
+        return redirect(url_for('index'))
+    
+    @app.route('/dashboard')
+    @login_required
+    def dashboard():
+        """User dashboard with statistics and dataset load progress"""
+        job_id = request.args.get('job')
+        load_status = mongo.get_load_status(job_id) if job_id else None
+        if load_status and load_status['done']:
+            if load_status['error']:
+                flash(load_status['error'], 'danger')
+            else:
+                flash(f'Successfully loaded {load_status["loaded"]} patients!', 'success')
+            # Drop the job from the URL so a reload doesn't look for it again
+            return redirect(url_for('dashboard'))
+        
+        try:
+            stats = mongo.get_statistics()
+        except Exception as e:
+            flash(f'Error loading statistics: {str(e)}', 'danger')
+            stats = None
+        return render_template('dashboard.html', stats=stats, loading=load_status is not None)
+    
+    @app.route('/load_dataset')
+    @login_required
+    def load_dataset():
+        """Start loading the stroke dataset into MongoDB"""
+        csv_path = current_app.config.get('DATASET_PATH')
+        if not csv_path or not os.path.isfile(csv_path):
+            flash(f'Dataset file not found: {csv_path}', 'danger')
+            return redirect(url_for('dashboard'))
+        
+        # The dashboard polls the job and reports the result once it finishes
+        job_id = mongo.start_dataset_load(csv_path)
+        return redirect(url_for('dashboard', job=job_id))
+    
+    @app.route('/load_dataset/status/<job_id>')
+    @login_required
+    def load_dataset_status(job_id):
+        """Report a background dataset load; finished jobs are reported once"""
+        status = mongo.get_load_status(job_id)
+        if status is None:
+            abort(404)
+        return jsonify(status)
+    
+    @app.route('/patients')
+    @login_required
+    def patients():
+        """List patients, one page at a time"""
+        after_id = request.args.get('after', type=int)
+        patients = mongo.get_all_patients(after_id=after_id)
+        return render_template('patients.html', patients=patients, after_id=after_id)
+    
+    @app.route('/patient/<int:patient_id>')
+    @login_required
+    def patient_detail(patient_id):
+        """View patient details"""
+        patient = mongo.get_patient_by_id(patient_id)
+        if not patient:
+            flash('Patient not found', 'danger')
+            return redirect(url_for('patients'))
+        return render_template('patient_detail.html', patient=patient)
+    
+    @app.route('/patient/add', methods=['GET', 'POST'])
+    @login_required
+    def add_patient():
+        """Add a new patient"""
+        form = PatientForm()
+        if form.validate_on_submit():
+            mongo.add_patient(_patient_from_form(form))
+            flash('Patient added successfully!', 'success')
+            return redirect(url_for('patients'))
+        
+        return render_template('patient_form.html', form=form, action='Add')
+    
+    @app.route('/patient/edit/<int:patient_id>', methods=['GET', 'POST'])
+    @login_required
+    def edit_patient(patient_id):
+        """Edit an existing patient"""
+        patient = mongo.get_patient_by_id(patient_id)
+        if not patient:
+            flash('Patient not found', 'danger')
+            return redirect(url_for('patients'))
+        
+        form = PatientForm()
+        if form.validate_on_submit():
+            mongo.update_patient(patient_id, _patient_from_form(form))
+            flash('Patient updated successfully!', 'success')
+            return redirect(url_for('patient_detail', patient_id=patient_id))
+        
+        if request.method == 'GET':
+            # Pre-fill the form; select fields hold their values as strings
+            form.process(data={
+                key: str(value) if key in ('hypertension', 'heart_disease', 'stroke') else value
+                for key, value in patient.items()
+            })
+        
+        return render_template('patient_form.html', form=form, action='Edit')
+    
+    @app.route('/patient/delete/<int:patient_id>', methods=['POST'])
+    @login_required
+    def delete_patient(patient_id):
+        """Delete a patient"""
+        if mongo.delete_patient(patient_id):
+            flash('Patient deleted successfully!', 'success')
+        else:
+            flash('Patient not found', 'danger')
+        return redirect(url_for('patients'))
+    
+    @app.route('/search', methods=['GET', 'POST'])
+    @login_required
+    def search():
+        """Search patients"""
+        form = SearchForm()
+        results = []
+        if form.validate_on_submit():
+            results = mongo.search_patients(form.query.data)
+            if not results:
+                flash('No patients found matching your search', 'info')
+        
+        return render_template('search.html', form=form, results=results)
+
+def register_error_handlers(app):
+    """Register error page handlers"""
+    
+    @app.errorhandler(404)
+    def not_found(error):
+        return render_template('404.html'), 404
+    
+    @app.errorhandler(500)
+    def internal_error(error):
+        db.session.rollback()
+        return render_template('500.html'), 500
@@ -9,16 +9,34 @@ class Config:
     # SQLite database for user authentication
     SQLALCHEMY_DATABASE_URI = 'sqlite:///users.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTO_CREATE_TABLES = False  # Tables are created by setup.py
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 20,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
     
     # MongoDB configuration for patient data
+    MONGO_ENABLED = True
     MONGO_URI = 'mongodb://localhost:27017/'
     MONGO_DBNAME = 'stroke_prediction_db'
+    MONGO_CLIENT_OPTIONS = {
+        'maxPoolSize': 50,
+        'minPoolSize': 5,
+        'compressors': 'zstd,zlib',  # zstd needs the zstandard package
+        'retryWrites': True,
+        'serverSelectionTimeoutMS': 2000
+    }
+    STATS_CACHE_TTL = 30  # seconds the dashboard statistics are cached
     
     # Security settings
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 1800  # 30 minutes
+    PASSWORD_HASH_METHOD = 'scrypt'  # Werkzeug hashing method and work factor
+    USE_VERIFY_PASSWORD_CACHE = True  # Reuse check_password_hash results for 60s on identical logins
     
     # CSV dataset path
     DATASET_PATH = 'data/healthcare-dataset-stroke-data.csv'
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from werkzeug.security import generate_password_hash
+from app import create_app
+from app.models import db, User, invalidate_user_cache
+from app.database import mongo
+from config import Config
+
+class TestConfig(Config):
+    """Testing configuration"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # One shared connection keeps the :memory: database alive across sessions
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'connect_args': {'check_same_thread': False},
+        'poolclass': StaticPool
+    }
+    WTF_CSRF_ENABLED = False
+    # Low work factor: tests check hashing behaviour, not its strength
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    # Auth and security tests never touch patient data, so skip the client
+    MONGO_ENABLED = False
+
+class MongoTestConfig(TestConfig):
+    """Testing configuration for tests that read and write patients"""
+    MONGO_ENABLED = True
+    # Separate database per pytest-xdist worker so workers don't clear each other's data
+    MONGO_DBNAME = f"test_stroke_prediction_db_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+
+# Hashed once at import so tests that only need a user skip key derivation
+_TEST_HASH = generate_password_hash('testpass123', method=TestConfig.PASSWORD_HASH_METHOD)
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_test_pragmas(dbapi_connection, connection_record):
+    """Skip durability work the in-memory test database does not need"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        # Stop pysqlite managing transactions itself, so the SAVEPOINTs used by
+        # db_session nest inside a real BEGIN (see _begin_sqlite_transaction)
+        dbapi_connection.isolation_level = None
+        
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA synchronous=OFF')
+        cursor.execute('PRAGMA journal_mode=MEMORY')
+        cursor.execute('PRAGMA locking_mode=EXCLUSIVE')
+        cursor.close()
+
+@event.listens_for(Engine, 'begin')
+def _begin_sqlite_transaction(connection):
+    """Emit BEGIN ourselves, so rolling back a test's transaction undoes it"""
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('BEGIN')
+
+def login(client, user_id):
+    """Log a user in by writing Flask-Login's session keys directly"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+def _build_app(config_class):
+    """Build an app and its schema from the given test configuration"""
+    app = create_app(config_class)
+    
+    # The :memory: database lives on the single StaticPool connection, so it
+    # needs no drop_all; it goes away with the engine
+    with app.app_context():
+        db.create_all()
+    return app
+
+@pytest.fixture(scope='session')
+def app():
+    """Build the app without MongoDB once for the whole test run"""
+    return _build_app(TestConfig)
+
+@pytest.fixture(scope='session')
+def mongo_app():
+    """Build the app with a MongoDB test database, for tests that use patients"""
+    app = _build_app(MongoTestConfig)
+    
+    # The extensions must have been built from MongoTestConfig, not the defaults
+    assert mongo.db.name == MongoTestConfig.MONGO_DBNAME
+    
+    # Start from an empty MongoDB test database
+    mongo.patients.delete_many({})
+    return app
+
+@pytest.fixture
+def app_context(app):
+    """Push an app context for tests that call models directly, not the client"""
+    # Client requests reuse a pushed app context, and with it g and the
+    # logged-in user, so tests that make requests must not hold one open
+    with app.app_context():
+        yield
+
+@pytest.fixture
+def db_session(app):
+    """Run each test inside a transaction that is rolled back afterwards"""
+    with app.app_context():
+        connection = db.engine.connect()
+    transaction = connection.begin()
+    
+    # Commits made by the app only release a SAVEPOINT
+    original_session = db.session
+    db.session = scoped_session(sessionmaker(
+        bind=connection,
+        join_transaction_mode='create_savepoint'
+    ))
+    
+    yield db.session
+    
+    db.session.remove()
+    db.session = original_session
+    transaction.rollback()
+    connection.close()
+    
+    # Rolled-back users must not be served from the cache to the next test
+    invalidate_user_cache()
+
+@pytest.fixture
+def client(app, db_session):
+    """Test client with no logged-in user"""
+    return app.test_client()
+
+@pytest.fixture
+def flashes(client):
+    """Read the messages flashed into the client's session so far"""
+    def read():
+        with client.session_transaction() as session:
+            return [message for _, message in session.get('_flashes', [])]
+    return read
+
+@pytest.fixture
+def test_user(db_session):
+    """Insert the standard test user with a precomputed password hash"""
+    # Core insert skips the ORM unit of work for a fixture row
+    result = db_session.execute(User.__table__.insert().values(
+        username='testuser',
+        email='test@example.com',
+        password_hash=_TEST_HASH
+    ))
+    db_session.commit()
+    return result.inserted_primary_key[0]
+
+@pytest.fixture
+def auth_client(client, test_user):
+    """Test client logged in as the standard test user"""
+    login(client, test_user)
+    return client
@@ -1,95 +1,268 @@
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, TEXT, ReturnDocument
 from bson.objectid import ObjectId
 import csv
+import time
+from operator import itemgetter
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Number of CSV rows sent to MongoDB per insert_many call
+LOAD_CHUNK_SIZE = 1000
+
+# Maximum number of search results, fetched in a single batch
+SEARCH_LIMIT = 50
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Fields rendered by the patients list and search results templates
+PATIENT_LIST_PROJECTION = {
+    '_id': 0, 'id': 1, 'gender': 1, 'age': 1, 'hypertension': 1,
+    'ever_married': 1, 'work_type': 1, 'Residence_type': 1,
+    'avg_glucose_level': 1, 'bmi': 1, 'smoking_status': 1, 'stroke': 1
+}
+SEARCH_RESULT_PROJECTION = {
+    '_id': 0, 'id': 1, 'gender': 1, 'age': 1, 'work_type': 1,
+    'smoking_status': 1, 'stroke': 1
+}
+
+def _parse_bmi(value):
+    """Keep BMI as recorded, treating the dataset's 'N/A' as missing"""
+    return value if value != 'N/A' else None
+
+def _parse_glucose(value):
+    """Store glucose at the dataset's two-decimal precision"""
+    return round(float(value), 2)
+
+# Dataset columns in document order, with the converter applied to each
+# (None keeps the raw string)
+PATIENT_COLUMNS = (
+    ('id', int),
+    ('gender', None),
+    ('age', float),
+    ('hypertension', int),
+    ('heart_disease', int),
+    ('ever_married', None),
+    ('work_type', None),
+    ('Residence_type', None),
+    ('avg_glucose_level', _parse_glucose),
+    ('bmi', _parse_bmi),
+    ('smoking_status', None),
+    ('stroke', int)
+)
+
+class _MongoDisabled:
+    """Stands in for the database and collections until MongoDB is initialised"""
+    
+    def __getattr__(self, name):
+        raise RuntimeError('MongoDB is not initialised (MONGO_ENABLED is False)')
+    
+    def __getitem__(self, name):
+        return self.__getattr__(name)
+
 class MongoDB:
     """MongoDB handler for patient data"""
     
     def __init__(self, app=None):
         self.client = None
-        self.db = None
-        self.patients = None
+        self.db = self.patients = self.counters = _MongoDisabled()
+        self.stats_ttl = 30
+        self._stats_cache = {}
+        self._load_executor = ThreadPoolExecutor(max_workers=1)
+        self.load_jobs = {}
         if app:
             self.init_app(app)
     
     def init_app(self, app):
         """Initialize MongoDB connection"""
+        # Apps that never touch patient data can skip the connection entirely
+        if not app.config.get('MONGO_ENABLED', True):
+            return
+        
         mongo_uri = app.config['MONGO_URI']
         db_name = app.config['MONGO_DBNAME']
         
-        self.client = MongoClient(mongo_uri)
+        client_options = app.config.get('MONGO_CLIENT_OPTIONS', {})
+        
+        self.client = MongoClient(mongo_uri, **client_options)
         self.db = self.client[db_name]
         self.patients = self.db.patients
+        self.counters = self.db.counters
+        self.stats_ttl = app.config.get('STATS_CACHE_TTL', 30)
+        self._stats_cache.clear()
+        app.extensions['load_jobs'] = self.load_jobs
         
+        self._create_indexes(self.patients)
+        
+        # Patients loaded before the counter existed must not be reissued ids
+        last_patient = self.patients.find_one({}, {'id': 1}, sort=[('id', -1)])
+        self._raise_id_counter(last_patient['id'] if last_patient else 0)
+    
+    def _raise_id_counter(self, max_id):
+        """Make sure the next allocated patient ID is greater than max_id"""
+        self.counters.update_one(
+            {'_id': 'patient_id'},
+            {'$max': {'seq': max_id}},
+            upsert=True
+        )
+    
+    def _create_indexes(self, collection):
+        """Create the indexes the patient queries rely on"""
         # Create index on id field for faster queries
-        self.patients.create_index([('id', ASCENDING)], unique=True)
+        collection.create_index([('id', ASCENDING)], unique=True)
+        
+        # Index on stroke so the dashboard's stroke count is index-only
+        collection.create_index([('stroke', ASCENDING)])
+        
+        # Text index backing the search page
+        collection.create_index([
+            ('gender', TEXT),
+            ('work_type', TEXT),
+            ('smoking_status', TEXT)
+        ])
     
     def load_dataset(self, csv_path):
         """Load patient data from CSV into MongoDB"""
         try:
             with open(csv_path, 'r') as file:
-                csv_reader = csv.DictReader(file)
-                patients_data = []
+                csv_reader = csv.reader(file)
+                header = next(csv_reader, None)
+                if header is None:
+                    return 0
+                col = {name: i for i, name in enumerate(header)}
                 
-                for row in csv_reader:
-                    # Convert numeric fields
-                    patient = {
-                        'id': int(row['id']),
-                        'gender': row['gender'],
-                        'age': float(row['age']),
-                        'hypertension': int(row['hypertension']),
-                        'heart_disease': int(row['heart_disease']),
-                        'ever_married': row['ever_married'],
-                        'work_type': row['work_type'],
-                        'Residence_type': row['Residence_type'],
-                        'avg_glucose_level': float(row['avg_glucose_level']),
-                        'bmi': row['bmi'] if row['bmi'] != 'N/A' else None,
-                        'smoking_status': row['smoking_status'],
-                        'stroke': int(row['stroke']),
-                        'created_at': datetime.utcnow()
-                    }
-                    patients_data.append(patient)
+                # Pick each row's fields by position, in PATIENT_COLUMNS order
+                pick = itemgetter(*(col[name] for name, _ in PATIENT_COLUMNS))
                 
-                # Clear existing data and insert new
-                self.patients.delete_many({})
-                if patients_data:
-                    self.patients.insert_many(patients_data)
+                # Load into a staging collection so a bad row leaves the
+                # existing patients untouched
+                staging = self.db['patients_loading']
+                staging.drop()
+                self._create_indexes(staging)
+                now = datetime.utcnow()
+                rows = []
+                total = 0
+                max_id = 0
                 
-                return len(patients_data)
+                try:
+                    for row in csv_reader:
+                        # csv.reader yields [] for blank lines, which DictReader skipped
+                        if not row:
+                            continue
+                        rows.append(pick(row))
+                        if len(rows) >= LOAD_CHUNK_SIZE:
+                            count, chunk_max_id = self._insert_chunk(staging, rows, now)
+                            total += count
+                            max_id = max(max_id, chunk_max_id)
+                            rows = []
+                    
+                    if rows:
+                        count, chunk_max_id = self._insert_chunk(staging, rows, now)
+                        total += count
+                        max_id = max(max_id, chunk_max_id)
+                except Exception:
+                    staging.drop()
+                    raise
+                
+                # Swap the fully loaded data in for the existing patients
+                staging.rename(self.patients.name, dropTarget=True)
+                
+                self._stats_cache.clear()
+                
+                # New patients continue after the dataset's highest id
+                self._raise_id_counter(max_id)
+                
+                return total
         except Exception as e:
             raise Exception(f"Error loading dataset: {str(e)}")
     
-    def get_all_patients(self, skip=0, limit=50):
-        """Get all patients with pagination"""
-        return list(self.patients.find().skip(skip).limit(limit))
+    def _insert_chunk(self, collection, rows, created_at):
+        """Convert one chunk of row tuples and insert it as patient documents"""
+        # Convert column by column so int()/float() run inside map() rather
+        # than once per field in a Python loop
+        values = [
+            tuple(map(convert, column)) if convert else column
+            for (_, convert), column in zip(PATIENT_COLUMNS, zip(*rows))
+        ]
+        names = [name for name, _ in PATIENT_COLUMNS]
+        
+        patients_data = [dict(zip(names, record), created_at=created_at) for record in zip(*values)]
+        collection.insert_many(
+            patients_data,
+            ordered=False,
+            bypass_document_validation=True
+        )
+        return len(patients_data), max(values[0])
+    
+    def start_dataset_load(self, csv_path):
+        """Load the dataset on a background worker and return its job ID"""
+        job_id = uuid.uuid4().hex
+        self.load_jobs[job_id] = self._load_executor.submit(self.load_dataset, csv_path)
+        return job_id
+    
+    def get_load_status(self, job_id):
+        """Report progress of a background dataset load, or None if unknown"""
+        future = self.load_jobs.get(job_id)
+        if future is None:
+            return None
+        
+        status = {'done': future.done(), 'loaded': None, 'error': None}
+        if status['done']:
+            # Finished jobs are reported once, so load_jobs doesn't grow forever;
+            # of two concurrent polls only the one that removes the job reports it
+            future = self.load_jobs.pop(job_id, None)
+            if future is None:
+                return None
+            error = future.exception()
+            if error:
+                status['error'] = str(error)
+            else:
+                status['loaded'] = future.result()
+        return status
+    
+    def get_all_patients(self, after_id=None, limit=20, projection=PATIENT_LIST_PROJECTION):
+        """Get patients ordered by ID, starting after the given ID"""
+        # Keyset pagination on the id index avoids skip() walking earlier pages
+        query_filter = {'id': {'$gt': after_id}} if after_id else {}
+        cursor = self.patients.find(query_filter, projection).sort([('id', ASCENDING)])
+        return list(cursor.limit(limit).batch_size(limit))
     
     def get_patient_by_id(self, patient_id):
         """Get a single patient by ID"""
         return self.patients.find_one({'id': int(patient_id)})
     
-    def search_patients(self, query):
-        """Search patients by various fields"""
-        search_filter = {
-            '$or': [
-                {'id': {'$regex': str(query), '$options': 'i'}},
-                {'gender': {'$regex': query, '$options': 'i'}},
-                {'work_type': {'$regex': query, '$options': 'i'}},
-                {'smoking_status': {'$regex': query, '$options': 'i'}}
-            ]
-        }
-        return list(self.patients.find(search_filter).limit(50))
+    def search_patients(self, query, projection=SEARCH_RESULT_PROJECTION):
+        """Search patients by ID or by gender, work type and smoking status"""
+        # Numeric queries are an exact lookup on the indexed id field
+        try:
+            patient_id = int(query)
+        except ValueError:
+            patient_id = None
+        
+        # BSON stores ints as int64, so larger numbers are searched as text
+        if patient_id is not None and INT64_MIN <= patient_id <= INT64_MAX:
+            cursor = self.patients.find({'id': patient_id}, projection)
+            return list(cursor.limit(SEARCH_LIMIT).batch_size(SEARCH_LIMIT))
+        
+        score = dict(projection or {}, score={'$meta': 'textScore'})
+        cursor = self.patients.find({'$text': {'$search': query}}, score)
+        cursor = cursor.sort([('score', {'$meta': 'textScore'})])
+        return list(cursor.limit(SEARCH_LIMIT).batch_size(SEARCH_LIMIT))
     
     def add_patient(self, patient_data):
         """Add a new patient"""
-        # Get the next available ID
-        last_patient = self.patients.find_one(sort=[('id', -1)])
-        next_id = (last_patient['id'] + 1) if last_patient else 1
+        # Atomically allocate the next ID from the counters collection
+        counter = self.counters.find_one_and_update(
+            {'_id': 'patient_id'},
+            {'$inc': {'seq': 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
         
-        patient_data['id'] = next_id
+        patient_data['id'] = counter['seq']
         patient_data['created_at'] = datetime.utcnow()
         
         result = self.patients.insert_one(patient_data)
+        self._stats_cache.clear()
         return result.inserted_id
     
     def update_patient(self, patient_id, patient_data):
@@ -99,24 +272,34 @@ class MongoDB:
             {'id': int(patient_id)},
             {'$set': patient_data}
         )
+        self._stats_cache.clear()
         return result.modified_count > 0
     
     def delete_patient(self, patient_id):
         """Delete a patient"""
         result = self.patients.delete_one({'id': int(patient_id)})
+        self._stats_cache.clear()
         return result.deleted_count > 0
     
     def get_statistics(self):
         """Get basic statistics about patients"""
-        total = self.patients.count_documents({})
+        # Served from a short-lived cache, cleared whenever patients change
+        cached = self._stats_cache.get('stats')
+        if cached and time.monotonic() - cached[0] < self.stats_ttl:
+            return cached[1]
+        
+        # The unfiltered total comes from collection metadata
+        total = self.patients.estimated_document_count()
         stroke_count = self.patients.count_documents({'stroke': 1})
         
-        return {
+        stats = {
             'total_patients': total,
             'stroke_patients': stroke_count,
             'non_stroke_patients': total - stroke_count,
             'stroke_percentage': round((stroke_count / total * 100), 2) if total > 0 else 0
         }
+        self._stats_cache['stats'] = (time.monotonic(), stats)
+        return stats
 
 # Global MongoDB instance
 mongo = MongoDB()
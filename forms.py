@@ -1,9 +1,34 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, FloatField, SelectField, IntegerField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange
-from app.models import User
+from app.models import db, User
 import re
 
+# Usernames may only contain letters, numbers and underscores
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]+$')
+
+# SelectField choices shared by every PatientForm instance
+_GENDERS = (('', 'Select Gender'), ('Male', 'Male'), ('Female', 'Female'), ('Other', 'Other'))
+_YES_NO_FLAGS = (('0', 'No'), ('1', 'Yes'))
+_EVER_MARRIED = (('', 'Select'), ('No', 'No'), ('Yes', 'Yes'))
+_WORK_TYPES = (
+    ('', 'Select Work Type'),
+    ('children', 'Children'),
+    ('Govt_job', 'Government Job'),
+    ('Never_worked', 'Never Worked'),
+    ('Private', 'Private'),
+    ('Self-employed', 'Self-employed')
+)
+_RESIDENCE_TYPES = (('', 'Select'), ('Rural', 'Rural'), ('Urban', 'Urban'))
+_SMOKING_STATUSES = (
+    ('', 'Select Status'),
+    ('formerly smoked', 'Formerly Smoked'),
+    ('never smoked', 'Never Smoked'),
+    ('smokes', 'Smokes'),
+    ('Unknown', 'Unknown')
+)
+_STROKE_STATUSES = (('0', 'No Stroke'), ('1', 'Had Stroke'))
+
 class RegistrationForm(FlaskForm):
     """User registration form with validation"""
     
@@ -31,21 +56,27 @@ class RegistrationForm(FlaskForm):
                                         EqualTo('password', message='Passwords must match')
                                     ])
     
+    def _prefetch_conflicts(self):
+        """Fetch existing users sharing this username or email in one query"""
+        if not hasattr(self, '_conflicts'):
+            # Prevent SQL injection by using ORM
+            self._conflicts = db.session.query(User.username, User.email).filter(
+                (User.username == self.username.data) | (User.email == self.email.data)
+            ).all()
+        return self._conflicts
+    
     def validate_username(self, username):
         """Check if username already exists"""
-        # Prevent SQL injection by using ORM
-        user = User.query.filter_by(username=username.data).first()
-        if user:
+        if any(row.username == username.data for row in self._prefetch_conflicts()):
             raise ValidationError('Username already exists. Please choose a different one.')
         
         # Additional validation: only alphanumeric and underscore
-        if not re.match(r'^[a-zA-Z0-9_]+$', username.data):
+        if not _USERNAME_RE.match(username.data):
             raise ValidationError('Username can only contain letters, numbers, and underscores.')
     
     def validate_email(self, email):
         """Check if email already exists"""
-        user = User.query.filter_by(email=email.data).first()
-        if user:
+        if any(row.email == email.data for row in self._prefetch_conflicts()):
             raise ValidationError('Email already registered. Please use a different one.')
 
 class LoginForm(FlaskForm):
@@ -61,7 +92,7 @@ class PatientForm(FlaskForm):
     """Patient data form with validation"""
     
     gender = SelectField('Gender', 
-                        choices=[('', 'Select Gender'), ('Male', 'Male'), ('Female', 'Female'), ('Other', 'Other')],
+                        choices=_GENDERS,
                         validators=[DataRequired(message='Gender is required')])
     
     age = FloatField('Age', 
@@ -71,30 +102,23 @@ class PatientForm(FlaskForm):
                      ])
     
     hypertension = SelectField('Hypertension', 
-                              choices=[('0', 'No'), ('1', 'Yes')],
+                              choices=_YES_NO_FLAGS,
                               validators=[DataRequired(message='Hypertension status is required')])
     
     heart_disease = SelectField('Heart Disease', 
-                               choices=[('0', 'No'), ('1', 'Yes')],
+                               choices=_YES_NO_FLAGS,
                                validators=[DataRequired(message='Heart disease status is required')])
     
     ever_married = SelectField('Ever Married', 
-                              choices=[('', 'Select'), ('No', 'No'), ('Yes', 'Yes')],
+                              choices=_EVER_MARRIED,
                               validators=[DataRequired(message='Marital status is required')])
     
     work_type = SelectField('Work Type', 
-                           choices=[
-                               ('', 'Select Work Type'),
-                               ('children', 'Children'),
-                               ('Govt_job', 'Government Job'),
-                               ('Never_worked', 'Never Worked'),
-                               ('Private', 'Private'),
-                               ('Self-employed', 'Self-employed')
-                           ],
+                           choices=_WORK_TYPES,
                            validators=[DataRequired(message='Work type is required')])
     
     Residence_type = SelectField('Residence Type', 
-                                choices=[('', 'Select'), ('Rural', 'Rural'), ('Urban', 'Urban')],
+                                choices=_RESIDENCE_TYPES,
                                 validators=[DataRequired(message='Residence type is required')])
     
     avg_glucose_level = FloatField('Average Glucose Level', 
@@ -106,17 +130,11 @@ class PatientForm(FlaskForm):
     bmi = StringField('BMI (Body Mass Index)')
     
     smoking_status = SelectField('Smoking Status', 
-                                choices=[
-                                    ('', 'Select Status'),
-                                    ('formerly smoked', 'Formerly Smoked'),
-                                    ('never smoked', 'Never Smoked'),
-                                    ('smokes', 'Smokes'),
-                                    ('Unknown', 'Unknown')
-                                ],
+                                choices=_SMOKING_STATUSES,
                                 validators=[DataRequired(message='Smoking status is required')])
     
     stroke = SelectField('Stroke', 
-                        choices=[('0', 'No Stroke'), ('1', 'Had Stroke')],
+                        choices=_STROKE_STATUSES,
                         validators=[DataRequired(message='Stroke status is required')])
     
     def validate_bmi(self, bmi):
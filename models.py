@@ -1,10 +1,26 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from itertools import chain
+import hmac
+import time
 
 db = SQLAlchemy()
 
+# Recent password verification results: {hmac digest: (expires_at, ok)}
+_verify_cache = {}
+VERIFY_CACHE_SIZE = 1024
+VERIFY_CACHE_TTL = 60  # seconds
+
+# Logged-in users by id: {user_id: (expires_at, (id, username, email, created_at))}
+_user_cache = {}
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 300  # seconds, bounds staleness in other worker processes
+
 class User(UserMixin, db.Model):
     """User model for authentication stored in SQLite"""
     
@@ -18,11 +34,94 @@ class User(UserMixin, db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        if has_app_context():
+            method = current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+            self.password_hash = generate_password_hash(password, method=method)
+        else:
+            # Outside the app, e.g. from a shell or admin script, use Werkzeug's default
+            self.password_hash = generate_password_hash(password)
     
     def check_password(self, password):
         """Verify password against hash"""
         return check_password_hash(self.password_hash, password)
     
+    def check_password_cached(self, password):
+        """Verify password, reusing the result of an identical recent attempt"""
+        if not current_app.config.get('USE_VERIFY_PASSWORD_CACHE', False):
+            return self.check_password(password)
+        
+        # Keyed on the stored hash so a password change invalidates entries
+        key = hmac.new(
+            current_app.config['SECRET_KEY'].encode(),
+            f'{self.password_hash}\0{password}'.encode(),
+            'sha256'
+        ).digest()
+        now = time.monotonic()
+        
+        cached = _verify_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        ok = self.check_password(password)
+        if len(_verify_cache) >= VERIFY_CACHE_SIZE:
+            _verify_cache.clear()
+        _verify_cache[key] = (now + VERIFY_CACHE_TTL, ok)
+        return ok
+    
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+class CachedUser(UserMixin):
+    """Lightweight user rebuilt from the user cache for Flask-Login"""
+    
+    def __init__(self, id, username, email, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+    
     def __repr__(self):
         return f'<User {self.username}>'
+
+def load_cached_user(user_id):
+    """Load a user for Flask-Login without querying SQLite on every request"""
+    user_id = int(user_id)
+    now = time.monotonic()
+    
+    cached = _user_cache.get(user_id)
+    if cached and cached[0] > now:
+        return CachedUser(*cached[1])
+    
+    user = db.session.get(User, user_id)
+    if user is None:
+        # Misses are not cached, so a user created later is still found
+        return None
+    
+    fields = (user.id, user.username, user.email, user.created_at)
+    if len(_user_cache) >= USER_CACHE_SIZE:
+        _user_cache.clear()
+    _user_cache[user_id] = (now + USER_CACHE_TTL, fields)
+    return CachedUser(*fields)
+
+def invalidate_user_cache(user_id=None):
+    """Drop one cached user, or all of them"""
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(int(user_id), None)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    """Remember users updated or deleted in this transaction"""
+    changed = session.info.setdefault('changed_user_ids', set())
+    for obj in chain(session.dirty, session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    """Evict changed users once the change is visible to other sessions"""
+    # Evicting only after commit stops another request re-caching the old row
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_user_cache(user_id)
@@ -1,125 +1,167 @@
-import unittest
-from app import create_app
-from app.models import db, User
-from config import Config
+import pytest
+from app import models
+from app.models import User, load_cached_user
 
-class TestConfig(Config):
-    """Testing configuration"""
-    TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
-    WTF_CSRF_ENABLED = False
-    MONGO_DBNAME = 'test_stroke_prediction_db'
+@pytest.fixture
+def hashed_user(app_context, monkeypatch):
+    """User with a known password and an empty verification cache"""
+    monkeypatch.setattr(models, '_verify_cache', {})
+    user = User(username='testuser', email='test@example.com')
+    user.set_password('testpass123')
+    return user
 
-class AuthenticationTestCase(unittest.TestCase):
+class TestAuthentication:
     """Test cases for user authentication"""
     
-    def setUp(self):
-        """Set up test client and database"""
-        self.app = create_app()
-        self.app.config.from_object(TestConfig)
-        self.client = self.app.test_client()
-        
-        with self.app.app_context():
-            db.create_all()
-    
-    def tearDown(self):
-        """Clean up after tests"""
-        with self.app.app_context():
-            db.session.remove()
-            db.drop_all()
-    
-    def test_registration_success(self):
+    def test_registration_success(self, app, client):
         """Test successful user registration"""
-        response = self.client.post('/register', data={
+        response = client.post('/register', data={
             'username': 'testuser',
             'email': 'test@example.com',
             'password': 'testpass123',
             'confirm_password': 'testpass123'
-        }, follow_redirects=True)
+        })
         
-        self.assertEqual(response.status_code, 200)
+        assert response.status_code == 302
         
         # Check if user was created
-        with self.app.app_context():
+        with app.app_context():
             user = User.query.filter_by(username='testuser').first()
-            self.assertIsNotNone(user)
-            self.assertEqual(user.email, 'test@example.com')
+            assert user is not None
+            assert user.email == 'test@example.com'
     
-    def test_registration_duplicate_username(self):
+    def test_registration_duplicate_username(self, app, client, db_session):
         """Test registration with duplicate username"""
         # Create first user
-        with self.app.app_context():
+        with app.app_context():
             user = User(username='testuser', email='test1@example.com')
             user.set_password('password123')
-            db.session.add(user)
-            db.session.commit()
+        db_session.add(user)
+        db_session.commit()
         
         # Try to register with same username
-        response = self.client.post('/register', data={
+        response = client.post('/register', data={
             'username': 'testuser',
             'email': 'test2@example.com',
             'password': 'testpass123',
             'confirm_password': 'testpass123'
         })
         
-        self.assertIn(b'Username already exists', response.data)
+        assert b'Username already exists' in response.data
     
-    def test_login_success(self):
+    def test_login_success(self, app, client, db_session):
         """Test successful login"""
         # Create user
-        with self.app.app_context():
+        with app.app_context():
             user = User(username='testuser', email='test@example.com')
             user.set_password('testpass123')
-            db.session.add(user)
-            db.session.commit()
+        db_session.add(user)
+        db_session.commit()
         
         # Login
-        response = self.client.post('/login', data={
+        response = client.post('/login', data={
             'username': 'testuser',
             'password': 'testpass123'
         }, follow_redirects=True)
         
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Dashboard', response.data)
+        assert response.status_code == 200
+        assert b'Dashboard' in response.data
     
-    def test_login_invalid_credentials(self):
+    def test_login_invalid_credentials(self, client):
         """Test login with invalid credentials"""
-        response = self.client.post('/login', data={
+        response = client.post('/login', data={
             'username': 'nonexistent',
             'password': 'wrongpass'
         })
         
-        self.assertIn(b'Invalid username or password', response.data)
+        assert b'Invalid username or password' in response.data
     
-    def test_password_hashing(self):
+    def test_password_hashing(self, app_context):
         """Test that passwords are properly hashed"""
-        with self.app.app_context():
-            user = User(username='testuser', email='test@example.com')
-            user.set_password('testpass123')
-            
-            # Password should be hashed, not plain text
-            self.assertNotEqual(user.password_hash, 'testpass123')
-            self.assertTrue(user.check_password('testpass123'))
-            self.assertFalse(user.check_password('wrongpass'))
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('testpass123')
+        
+        # Password should be hashed, not plain text
+        assert user.password_hash != 'testpass123'
+        assert user.check_password('testpass123')
+        assert not user.check_password('wrongpass')
     
-    def test_logout(self):
+    def test_logout(self, app, client, db_session, flashes):
         """Test logout functionality"""
         # Create and login user
-        with self.app.app_context():
+        with app.app_context():
             user = User(username='testuser', email='test@example.com')
             user.set_password('testpass123')
-            db.session.add(user)
-            db.session.commit()
+        db_session.add(user)
+        db_session.commit()
         
-        self.client.post('/login', data={
+        client.post('/login', data={
             'username': 'testuser',
             'password': 'testpass123'
         })
         
         # Logout
-        response = self.client.get('/logout', follow_redirects=True)
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'logged out', response.data)
-
-if __name__ == '__main__':
-    unittest.main()
+        response = client.get('/logout')
+        assert response.status_code == 302
+        assert any('logged out' in message for message in flashes())
+    
+    def test_user_cache_hit(self, db_session, test_user):
+        """Test that a cached user is served without querying SQLite"""
+        assert load_cached_user(test_user).username == 'testuser'
+        
+        # A Core update bypasses the ORM, so only a fresh query would see it
+        db_session.execute(User.__table__.update().values(username='renamed'))
+        db_session.expire_all()
+        
+        assert load_cached_user(test_user).username == 'testuser'
+    
+    def test_user_cache_miss(self, db_session):
+        """Test that an unknown user id is not cached"""
+        assert load_cached_user(1) is None
+        
+        db_session.execute(User.__table__.insert().values(
+            id=1,
+            username='lateuser',
+            email='late@example.com',
+            password_hash='unused'
+        ))
+        
+        assert load_cached_user(1).username == 'lateuser'
+    
+    def test_user_cache_invalidation(self, db_session, test_user):
+        """Test that committed updates and deletes evict the cached user"""
+        load_cached_user(test_user)
+        
+        user = db_session.get(User, test_user)
+        user.email = 'changed@example.com'
+        db_session.commit()
+        assert load_cached_user(test_user).email == 'changed@example.com'
+        
+        db_session.delete(user)
+        db_session.commit()
+        assert load_cached_user(test_user) is None
+    
+    def test_cached_password_check_rejects_wrong_password(self, hashed_user):
+        """Test that a cached failure is still reported as a failure"""
+        assert not hashed_user.check_password_cached('wrongpass')
+        assert not hashed_user.check_password_cached('wrongpass')
+        assert hashed_user.check_password_cached('testpass123')
+    
+    def test_cached_password_check_skips_rehash(self, hashed_user, monkeypatch):
+        """Test that a repeated login reuses the earlier verification"""
+        assert hashed_user.check_password_cached('testpass123')
+        
+        def fail(password):
+            raise AssertionError('check_password should not run again')
+        monkeypatch.setattr(hashed_user, 'check_password', fail)
+        
+        assert hashed_user.check_password_cached('testpass123')
+    
+    def test_cached_password_check_after_password_change(self, hashed_user):
+        """Test that changing the password makes the old cache entry miss"""
+        assert hashed_user.check_password_cached('testpass123')
+        
+        hashed_user.set_password('newpass456')
+        
+        assert not hashed_user.check_password_cached('testpass123')
+        assert hashed_user.check_password_cached('newpass456')
@@ -1,53 +1,65 @@
-import unittest
-from app import create_app
-from app.models import db, User
+import pytest
+from concurrent.futures import Future
 from app.database import mongo
-from config import Config
 
-class TestConfig(Config):
-    """Testing configuration"""
-    TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
-    WTF_CSRF_ENABLED = False
-    MONGO_DBNAME = 'test_stroke_prediction_db'
+@pytest.fixture(scope='session')
+def app(mongo_app):
+    """CRUD tests read and write patients, so use the MongoDB-backed app"""
+    return mongo_app
 
-class CRUDTestCase(unittest.TestCase):
-    """Test cases for CRUD operations"""
-    
-    def setUp(self):
-        """Set up test client and database"""
-        self.app = create_app()
-        self.app.config.from_object(TestConfig)
-        self.client = self.app.test_client()
-        
-        with self.app.app_context():
-            db.create_all()
-            
-            # Create test user
-            user = User(username='testuser', email='test@example.com')
-            user.set_password('testpass123')
-            db.session.add(user)
-            db.session.commit()
-            
-            # Clear MongoDB test database
-            mongo.patients.delete_many({})
-        
-        # Login the test user
-        self.client.post('/login', data={
-            'username': 'testuser',
-            'password': 'testpass123'
-        })
+@pytest.fixture(autouse=True)
+def clear_patients():
+    """Leave the patients collection empty for the next test"""
+    yield
+    mongo.patients.delete_many({})
     
-    def tearDown(self):
-        """Clean up after tests"""
-        with self.app.app_context():
-            mongo.patients.delete_many({})
-            db.session.remove()
-            db.drop_all()
+    # A direct delete bypasses the stats cache invalidation in MongoDB
+    mongo._stats_cache.clear()
+
+# Canonical patients shared by the read, update, delete and search tests
+SEED_PATIENTS = [
+    {
+        'id': 1,
+        'gender': 'Female',
+        'age': 45,
+        'hypertension': 0,
+        'heart_disease': 0,
+        'ever_married': 'No',
+        'work_type': 'Private',
+        'Residence_type': 'Rural',
+        'avg_glucose_level': 120.5,
+        'bmi': '28.0',
+        'smoking_status': 'never smoked',
+        'stroke': 0
+    },
+    {
+        'id': 2,
+        'gender': 'Male',
+        'age': 55,
+        'hypertension': 1,
+        'heart_disease': 0,
+        'ever_married': 'Yes',
+        'work_type': 'Govt_job',
+        'Residence_type': 'Urban',
+        'avg_glucose_level': 110.0,
+        'bmi': '30.0',
+        'smoking_status': 'smokes',
+        'stroke': 0
+    }
+]
+
+@pytest.fixture
+def seeded_patient():
+    """Insert the canonical patients in one round trip and return the first ID"""
+    mongo.patients.insert_many([dict(patient) for patient in SEED_PATIENTS])
+    return SEED_PATIENTS[0]['id']
+
+class TestCRUD:
+    """Test cases for CRUD operations"""
     
-    def test_add_patient(self):
+    def test_add_patient(self, auth_client, flashes):
         """Test adding a new patient"""
-        response = self.client.post('/patient/add', data={
+        response = auth_client.post('/patient/add', data={
             'gender': 'Male',
             'age': 67,
             'hypertension': '1',
@@ -59,84 +71,72 @@ class CRUDTestCase(unittest.TestCase):
             'bmi': '36.6',
             'smoking_status': 'formerly smoked',
             'stroke': '1'
-        }, follow_redirects=True)
+        })
         
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Patient added successfully', response.data)
+        assert response.status_code == 302
+        assert any('Patient added successfully' in message for message in flashes())
         
         # Verify patient was added to MongoDB
-        with self.app.app_context():
-            patients = list(mongo.patients.find())
-            self.assertEqual(len(patients), 1)
-            self.assertEqual(patients[0]['gender'], 'Male')
+        assert mongo.patients.count_documents({}) == 1
+        assert mongo.patients.find_one({}, {'gender': 1})['gender'] == 'Male'
+    
+    def test_new_ids_follow_existing_patients(self, app, seeded_patient):
+        """Test that init_app seeds the id counter past patients already stored"""
+        # Patients stored before the counter existed, e.g. by an older release
+        mongo.counters.delete_many({})
+        mongo.init_app(app)
+        
+        inserted_id = mongo.add_patient(dict(SEED_PATIENTS[0]))
+        
+        assert mongo.patients.find_one({'_id': inserted_id})['id'] == 3
     
-    def test_view_patients(self):
+    def test_statistics_cache_cleared_on_change(self, seeded_patient):
+        """Test that cached statistics are refreshed after a patient changes"""
+        assert mongo.get_statistics()['total_patients'] == 2
+        
+        # Writes that bypass MongoDB's methods are served from the cache
+        mongo.patients.insert_one(dict(SEED_PATIENTS[0], id=3, stroke=1))
+        assert mongo.get_statistics()['total_patients'] == 2
+        
+        mongo.delete_patient(1)
+        stats = mongo.get_statistics()
+        assert stats['total_patients'] == 2
+        assert stats['stroke_patients'] == 1
+    
+    def test_view_patients(self, auth_client, seeded_patient):
         """Test viewing patients list"""
-        # Add a test patient
-        with self.app.app_context():
-            mongo.add_patient({
-                'gender': 'Female',
-                'age': 45,
-                'hypertension': 0,
-                'heart_disease': 0,
-                'ever_married': 'Yes',
-                'work_type': 'Private',
-                'Residence_type': 'Rural',
-                'avg_glucose_level': 120.5,
-                'bmi': '28.0',
-                'smoking_status': 'never smoked',
-                'stroke': 0
-            })
-        
-        response = self.client.get('/patients')
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Patients List', response.data)
-    
-    def test_view_patient_detail(self):
+        response = auth_client.get('/patients')
+        assert response.status_code == 200
+        assert b'Patients List' in response.data
+    
+    def test_view_patients_next_page(self, auth_client):
+        """Test that the patient list pages by id with a Next link"""
+        mongo.patients.insert_many([dict(SEED_PATIENTS[0], id=i) for i in range(1, 26)])
+        
+        response = auth_client.get('/patients')
+        assert b'href="/patient/20"' in response.data
+        assert b'href="/patient/21"' not in response.data
+        assert b'href="/patients?after=20"' in response.data
+        
+        response = auth_client.get('/patients?after=20')
+        assert b'href="/patient/20"' not in response.data
+        assert all(f'href="/patient/{i}"'.encode() in response.data for i in range(21, 26))
+        
+        # A short last page has no Next link
+        assert b'after=' not in response.data
+    
+    def test_view_patient_detail(self, auth_client, seeded_patient):
         """Test viewing individual patient details"""
-        # Add a test patient
-        with self.app.app_context():
-            mongo.add_patient({
-                'gender': 'Male',
-                'age': 50,
-                'hypertension': 1,
-                'heart_disease': 0,
-                'ever_married': 'Yes',
-                'work_type': 'Govt_job',
-                'Residence_type': 'Urban',
-                'avg_glucose_level': 150.0,
-                'bmi': '30.0',
-                'smoking_status': 'smokes',
-                'stroke': 0
-            })
-            patient = mongo.patients.find_one()
-        
-        response = self.client.get(f'/patient/{patient["id"]}')
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Patient Details', response.data)
-    
-    def test_update_patient(self):
+        response = auth_client.get(f'/patient/{seeded_patient}')
+        assert response.status_code == 200
+        assert b'Patient Details' in response.data
+    
+    def test_update_patient(self, auth_client, seeded_patient, flashes):
         """Test updating patient information"""
-        # Add a test patient
-        with self.app.app_context():
-            mongo.add_patient({
-                'gender': 'Female',
-                'age': 30,
-                'hypertension': 0,
-                'heart_disease': 0,
-                'ever_married': 'No',
-                'work_type': 'Private',
-                'Residence_type': 'Urban',
-                'avg_glucose_level': 90.0,
-                'bmi': '25.0',
-                'smoking_status': 'never smoked',
-                'stroke': 0
-            })
-            patient = mongo.patients.find_one()
-            patient_id = patient['id']
+        patient_id = seeded_patient
         
         # Update patient
-        response = self.client.post(f'/patient/edit/{patient_id}', data={
+        response = auth_client.post(f'/patient/edit/{patient_id}', data={
             'gender': 'Female',
             'age': 31,  # Changed age
             'hypertension': '0',
@@ -148,71 +148,122 @@ class CRUDTestCase(unittest.TestCase):
             'bmi': '25.0',
             'smoking_status': 'never smoked',
             'stroke': '0'
-        }, follow_redirects=True)
+        })
         
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Patient updated successfully', response.data)
+        assert response.status_code == 302
+        assert any('Patient updated successfully' in message for message in flashes())
         
         # Verify changes
-        with self.app.app_context():
-            updated_patient = mongo.get_patient_by_id(patient_id)
-            self.assertEqual(updated_patient['age'], 31)
-            self.assertEqual(updated_patient['ever_married'], 'Yes')
+        updated_patient = mongo.get_patient_by_id(patient_id)
+        assert updated_patient['age'] == 31
+        assert updated_patient['ever_married'] == 'Yes'
     
-    def test_delete_patient(self):
+    def test_delete_patient(self, auth_client, seeded_patient, flashes):
         """Test deleting a patient"""
-        # Add a test patient
-        with self.app.app_context():
-            mongo.add_patient({
-                'gender': 'Male',
-                'age': 60,
-                'hypertension': 1,
-                'heart_disease': 1,
-                'ever_married': 'Yes',
-                'work_type': 'Self-employed',
-                'Residence_type': 'Rural',
-                'avg_glucose_level': 200.0,
-                'bmi': '35.0',
-                'smoking_status': 'formerly smoked',
-                'stroke': 1
-            })
-            patient = mongo.patients.find_one()
-            patient_id = patient['id']
+        patient_id = seeded_patient
         
         # Delete patient
-        response = self.client.post(f'/patient/delete/{patient_id}', follow_redirects=True)
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Patient deleted successfully', response.data)
+        response = auth_client.post(f'/patient/delete/{patient_id}')
+        assert response.status_code == 302
+        assert any('Patient deleted successfully' in message for message in flashes())
         
         # Verify deletion
-        with self.app.app_context():
-            deleted_patient = mongo.get_patient_by_id(patient_id)
-            self.assertIsNone(deleted_patient)
-    
-    def test_search_patients(self):
-        """Test patient search functionality"""
-        # Add test patients
-        with self.app.app_context():
-            mongo.add_patient({
-                'gender': 'Male',
-                'age': 55,
-                'hypertension': 0,
-                'heart_disease': 0,
-                'ever_married': 'Yes',
-                'work_type': 'Govt_job',
-                'Residence_type': 'Urban',
-                'avg_glucose_level': 110.0,
-                'bmi': '28.0',
-                'smoking_status': 'never smoked',
-                'stroke': 0
-            })
-        
-        response = self.client.post('/search', data={
-            'query': 'Govt_job'
+        deleted_patient = mongo.get_patient_by_id(patient_id)
+        assert deleted_patient is None
+    
+    @pytest.mark.parametrize('query, found, not_found', [
+        ('Govt_job', 2, 1),
+        ('1', 1, 2)
+    ])
+    def test_search_patients(self, auth_client, seeded_patient, query, found, not_found):
+        """Test patient search by text and by numeric id"""
+        response = auth_client.post('/search', data={
+            'query': query
         })
         
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'Govt_job', response.data)
-
-if __name__ == '__main__':
-    unittest.main()
+        # The query is echoed back in the search box, so check the result links
+        assert response.status_code == 200
+        assert f'href="/patient/{found}"'.encode() in response.data
+        assert f'href="/patient/{not_found}"'.encode() not in response.data
+    
+    def test_search_number_beyond_int64(self, auth_client, seeded_patient):
+        """Test that a number too large for an id is searched as text"""
+        response = auth_client.post('/search', data={
+            'query': '99999999999999999999'
+        })
+        
+        assert response.status_code == 200
+        assert b'Search Results' not in response.data
+    
+    @pytest.mark.parametrize('row, message', [
+        ('1,Male,67,0,1,Yes,Private,Urban,228.69,36.6,formerly smoked,1', 'Successfully loaded 1 patients'),
+        ('not-a-number,Male,67,0,1,Yes,Private,Urban,228.69,36.6,formerly smoked,1', 'Error loading dataset')
+    ])
+    def test_load_dataset_reports_result(self, app, auth_client, flashes, tmp_path, monkeypatch, row, message):
+        """Test that the dashboard reports a finished dataset load once"""
+        csv_path = tmp_path / 'patients.csv'
+        csv_path.write_text(
+            'id,gender,age,hypertension,heart_disease,ever_married,work_type,'
+            'Residence_type,avg_glucose_level,bmi,smoking_status,stroke\n' + row + '\n'
+        )
+        monkeypatch.setitem(app.config, 'DATASET_PATH', str(csv_path))
+        
+        response = auth_client.get('/load_dataset')
+        assert response.status_code == 302
+        job_id = response.headers['Location'].split('job=')[1]
+        mongo.load_jobs[job_id].exception(timeout=30)
+        
+        response = auth_client.get(f'/dashboard?job={job_id}')
+        assert response.status_code == 302
+        assert any(message in flashed for flashed in flashes())
+        assert job_id not in mongo.load_jobs
+    
+    def test_dashboard_polls_running_load(self, auth_client, monkeypatch):
+        """Test that the dashboard keeps refreshing while a load is running"""
+        monkeypatch.setitem(mongo.load_jobs, 'running', Future())
+        
+        response = auth_client.get('/dashboard?job=running')
+        
+        assert response.status_code == 200
+        assert b'http-equiv="refresh"' in response.data
+        assert 'running' in mongo.load_jobs
+    
+    def test_load_dataset_missing_file(self, app, auth_client, flashes, tmp_path, monkeypatch):
+        """Test that a missing dataset file is reported instead of started"""
+        monkeypatch.setitem(app.config, 'DATASET_PATH', str(tmp_path / 'missing.csv'))
+        
+        response = auth_client.get('/load_dataset')
+        
+        assert response.status_code == 302
+        assert any('Dataset file not found' in message for message in flashes())
+        assert not mongo.load_jobs
+    
+    def test_load_dataset_skips_blank_lines(self, tmp_path):
+        """Test that blank lines in the CSV are skipped, not loaded"""
+        csv_path = tmp_path / 'patients.csv'
+        csv_path.write_text(
+            'id,gender,age,hypertension,heart_disease,ever_married,work_type,'
+            'Residence_type,avg_glucose_level,bmi,smoking_status,stroke\n'
+            '1,Male,67,0,1,Yes,Private,Urban,228.69,36.6,formerly smoked,1\n'
+            '\n'
+            '2,Female,61,0,0,Yes,Self-employed,Rural,202.21,N/A,never smoked,1\n'
+            '\n'
+        )
+        
+        assert mongo.load_dataset(str(csv_path)) == 2
+        assert mongo.patients.count_documents({}) == 2
+    
+    def test_load_status_reported_once(self, tmp_path):
+        """Test that a finished dataset load is reported, then forgotten"""
+        csv_path = tmp_path / 'patients.csv'
+        csv_path.write_text(
+            'id,gender,age,hypertension,heart_disease,ever_married,work_type,'
+            'Residence_type,avg_glucose_level,bmi,smoking_status,stroke\n'
+            '1,Male,67,0,1,Yes,Private,Urban,228.69,36.6,formerly smoked,1\n'
+        )
+        
+        job_id = mongo.start_dataset_load(str(csv_path))
+        mongo.load_jobs[job_id].result(timeout=30)
+        
+        assert mongo.get_load_status(job_id) == {'done': True, 'loaded': 1, 'error': None}
+        assert mongo.get_load_status(job_id) is None